@@ -1,41 +1,59 @@
 import argparse
+import hashlib
 import logging
+import numpy as np
+import os
 import pandas as pd
-import plotly.express as px
+import plotly.colors as pc
 import plotly.graph_objects as go
 import re
 import streamlit as st
+import tempfile
 from dataclasses import dataclass
 from io import BytesIO
 from meteostat import Point, Hourly
+from pathlib import Path
 from plotly.subplots import make_subplots
-from typing import BinaryIO, List, Optional, Tuple
+from typing import List, Optional, Tuple
 from uszipcode import SearchEngine
 
-parser = argparse.ArgumentParser(description="Change logging level using a command-line argument.")
-parser.add_argument(
-    "--level",
-    type=str,
-    choices=["INFO", "WARNING"],
-    default="WARNING",
-    help="Set the logging level (default: WARNING)",
-)
+logger = logging.getLogger(__name__)
 
-args = parser.parse_args()
 
-logger = logging.getLogger(__name__)
+@st.cache_resource
+def setup_logging() -> None:
+    # Streamlit reruns the whole script, only parse args and configure logging once
+    parser = argparse.ArgumentParser(
+        description="Change logging level using a command-line argument."
+    )
+    parser.add_argument(
+        "--level",
+        type=str,
+        choices=["INFO", "WARNING"],
+        default="WARNING",
+        help="Set the logging level (default: WARNING)",
+    )
 
-logging.basicConfig(
-    format="%(asctime)s.%(msecs)03d %(levelname)-8s %(message)s",
-    level=getattr(logging, args.level),
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        format="%(asctime)s.%(msecs)03d %(levelname)-8s %(message)s",
+        level=getattr(logging, args.level),
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+
+setup_logging()
 
 electric_units = "kWh"
 local_tz = "America/Los_Angeles"
+zip_5_4_re = re.compile(rb"(9\d{4})(\d{4})")
 filename = (
     "data/pge_electric_usage_interval_data_Service 1_1_2023-12-19_to_2024-12-19.csv"
 )
+cache_dir = Path("cache")
+# bump when read_process_csv output changes so old parquet sidecars are not reused
+energy_cache_version = 1
 
 # make white / alpha channel to overlay high energy on weather temperature
 alpha_scale = [
@@ -105,6 +123,7 @@ class HeaderAddress:
     zip_5_4: Tuple[int, ...]
     header_line_num: int
     col_names: List[str]
+    post_header_offset: int
 
 
 @dataclass
@@ -121,17 +140,28 @@ class CustomTicks:
     y_tick_labels: List[str]
 
 
-def get_zip_header_line_col_names(_file: BinaryIO) -> HeaderAddress:
-    logger.info("Reading input file lines and decoding bytes to UTF-8")
-    _lines = _file.readlines()
-    _lines = [line.decode("utf-8") for line in _lines]
-
-    logger.info("Finding address starting with: Address")
-    _address_line_num = next(
-        (i for i, line in enumerate(_lines) if line.startswith("Address")), None
-    )
-
-    if _address_line_num is None:
+@st.cache_data(show_spinner=False)
+def get_zip_header_line_col_names(file_bytes: bytes) -> HeaderAddress:
+    # NOTE: st.cache_data skips hashing arguments prefixed with _, so cached
+    # functions take their inputs without the leading underscore
+    _file = BytesIO(file_bytes)
+
+    logger.info("Scanning input file lines for the Address and TYPE header lines")
+    _address_line = None
+    _header_line = None
+    _header_line_num = None
+
+    # stream raw lines and stop at the header, only the header line is decoded
+    for i, line in enumerate(_file):
+        if _address_line is None and line.startswith(b"Address"):
+            _address_line = line
+        elif line.startswith(b"TYPE"):
+            _header_line = line.decode("utf-8")
+            _header_line_num = i
+            _post_header_offset = _file.tell()
+            break
+
+    if _address_line is None:
         error_msg = (
             "Error: no line starting with Address found. This may be an invalid .csv"
         )
@@ -141,22 +171,13 @@ def get_zip_header_line_col_names(_file: BinaryIO) -> HeaderAddress:
 
     logger.info("Finding 5+4 zip code in address line")
     try:
-        _zip_5_4 = tuple(
-            map(int, re.findall(r"(9\d{4})(\d{4})", _lines[_address_line_num])[0])
-        )
+        _zip_5_4 = tuple(map(int, zip_5_4_re.findall(_address_line)[0]))
     except IndexError:
         error_msg = "Error: no zip code found. This may be an invalid .csv"
         logger.error(error_msg)
         st.error(error_msg)
         st.stop()
 
-    # don't need to seek if we assume header comes after address
-
-    logger.info("Finding header, line starting with: TYPE")
-    _header_line_num = next(
-        (i for i, line in enumerate(_lines) if line.startswith("TYPE")), None
-    )
-
     if _header_line_num is None:
         error_msg = (
             "Error: no line starting with TYPE found. This may be an invalid .csv"
@@ -165,38 +186,98 @@ def get_zip_header_line_col_names(_file: BinaryIO) -> HeaderAddress:
         st.error(error_msg)
         st.stop()
 
-    logger.info(f"Line: {_header_line_num} starts with TYPE and should be the header")
+    logger.info("Line: %s starts with TYPE and should be the header", _header_line_num)
 
     logger.info("Getting the column names from the header line")
-    _column_names = _lines[_header_line_num].split(",")
+    _column_names = _header_line.split(",")
+
+    return HeaderAddress(_zip_5_4, _header_line_num, _column_names, _post_header_offset)
 
-    return HeaderAddress(_zip_5_4, _header_line_num, _column_names)
 
+def read_process_csv(file_bytes: bytes, header_address: HeaderAddress) -> pd.DataFrame:
+    # start pandas right after the header instead of re-tokenizing the lines above it
+    _file = BytesIO(file_bytes)
+    _file.seek(header_address.post_header_offset)
 
-def read_process_csv(_file: BinaryIO, _header_address: HeaderAddress) -> pd.DataFrame:
     _df = pd.read_csv(
         _file,
-        skiprows=_header_address.header_line_num + 1,
+        header=None,
         names=header_address.col_names,
+        usecols=["DATE", "START TIME", "USAGE (kWh)", "COST"],
+        dtype={
+            "DATE": "string",
+            "START TIME": "string",
+            "USAGE (kWh)": "float32",
+            "COST": "string",
+        },
     )
 
-    _df.drop(columns=["TYPE"], inplace=True)
     _df.rename(columns={"USAGE (kWh)": "USAGE"}, inplace=True)
-    _df["DATETIME"] = pd.to_datetime(_df["DATE"] + " " + _df["START TIME"])
+    _df["DATETIME"] = pd.to_datetime(
+        _df["DATE"], format="%Y-%m-%d", cache=True
+    ) + pd.to_timedelta(_df["START TIME"] + ":00")
     _df.set_index("DATETIME", inplace=True)
-    _df.COST = _df.COST.apply(lambda x: float(x.replace("$", "")))
+    _df["COST"] = _df["COST"].str.replace("$", "", regex=False).astype("float32")
     _df["PRICEPERKWH"] = _df.COST / _df.USAGE
-    _df["MONTH"] = _df.index.strftime("%b")
+    _df["MONTH"] = pd.Categorical.from_codes(
+        _df.index.month - 1, categories=month_order, ordered=True
+    )
 
     return _df
 
 
-def get_process_weather(
-    _header_address: HeaderAddress, _start_end_datetime: StartEndDatetime
-) -> pd.DataFrame:
+@st.cache_data(show_spinner=False)
+def load_energy_df(file_bytes: bytes, header_address: HeaderAddress) -> pd.DataFrame:
+    _hash = hashlib.blake2b(digest_size=8)
+    _hash.update(f"v{energy_cache_version}".encode())
+    _hash.update(file_bytes)
+    _cache_path = cache_dir / f"{_hash.hexdigest()}.parquet"
+
+    if _cache_path.exists():
+        logger.info("Reading processed energy from: %s", _cache_path)
+        try:
+            return pd.read_parquet(_cache_path)
+        except (OSError, ValueError) as e:
+            logger.warning(
+                "Warning: could not read: %s, re-parsing: %s", _cache_path, e
+            )
+
+    _df = read_process_csv(file_bytes, header_address)
+
+    logger.info("Writing processed energy to: %s", _cache_path)
+    _tmp_path = None
+    try:
+        cache_dir.mkdir(exist_ok=True)
+
+        # write to a temp file and rename so readers never see a partial parquet
+        _tmp_fd, _tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".parquet.tmp")
+        os.close(_tmp_fd)
+        _df.to_parquet(_tmp_path, compression="zstd")
+        os.replace(_tmp_path, _cache_path)
+    except (OSError, ValueError) as e:
+        logger.warning("Warning: could not write: %s: %s", _cache_path, e)
+        if _tmp_path is not None and os.path.exists(_tmp_path):
+            os.remove(_tmp_path)
+
+    return _df
+
+
+@st.cache_data(show_spinner=False)
+def zip_to_lat_lng(zip_5: int) -> Tuple[float, float]:
+    # cache the coordinates, not the engine: its SQLite session is bound to the
+    # thread that first queried it, and Streamlit reruns on new threads
     _search = SearchEngine()
-    _zipcode = _search.by_zipcode(_header_address.zip_5_4[0])
-    _location = Point(_zipcode.lat, _zipcode.lng)
+    try:
+        _zipcode = _search.by_zipcode(zip_5)
+    finally:
+        _search.close()
+
+    return _zipcode.lat, _zipcode.lng
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def fetch_weather(zip_5: int, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    _location = Point(*zip_to_lat_lng(zip_5))
 
     # NOTE: meteostat throws a warning and 2 future warnings
     # FutureWarning: Support for nested sequences for 'parse_dates' in pd.read_csv is deprecated.Combine the desired columns with pd.to_datetime after parsing instead.
@@ -208,27 +289,98 @@ def get_process_weather(
     #     # Default frequency
     #     _freq: str = "1H"
 
-    _weather_hourly = Hourly(
-        _location, _start_end_datetime.start, _start_end_datetime.end
+    _weather_hourly = Hourly(_location, start, end)
+
+    # only temperature is plotted, so only cache that column
+    return _weather_hourly.fetch()[["temp"]]
+
+
+def get_process_weather(
+    _header_address: HeaderAddress, _start_end_datetime: StartEndDatetime
+) -> pd.DataFrame:
+    _df = fetch_weather(
+        _header_address.zip_5_4[0],
+        _start_end_datetime.start,
+        _start_end_datetime.end,
     )
-    _df = _weather_hourly.fetch()
-    _df.index = pd.to_datetime(_df.index, utc=True)
-    _df.index = _df.index.tz_convert(local_tz)
-    _df["DATE"] = _df.index.date
-    _df["TIME"] = _df.index.time
-    _df["TEMP_F"] = _df.temp * 9 / 5 + 32
+    # to_datetime also handles the empty, non-datetime index Meteostat returns on a miss
+    _df.index = pd.to_datetime(_df.index, utc=True).tz_convert(local_tz)
+
+    # keep local day and hour as datetime64 / int8 instead of Python date / time objects
+    _local_wall_clock = _df.index.tz_localize(None)
+    _df["DAY"] = _local_wall_clock.normalize()
+    _df["HOUR"] = _local_wall_clock.hour.astype("int8")
+    _df["TEMP_F"] = (_df.temp * 9 / 5 + 32).astype("float32")
 
     return _df
 
 
+def pivot_hourly(
+    _df: pd.DataFrame, _day_col: str, _hour_col: str, _value_col: str
+) -> pd.DataFrame:
+    # sorted codes give the same row / column order as DataFrame.pivot
+    _hour_codes, _hours = pd.factorize(_df[_hour_col], sort=True)
+    _day_codes, _days = pd.factorize(_df[_day_col], sort=True)
+    _valid = (_hour_codes >= 0) & (_day_codes >= 0)
+    _hour_codes = _hour_codes[_valid]
+    _day_codes = _day_codes[_valid]
+
+    # place each value in its (hour, day) cell, a DST gap just stays NaN
+    _cells = _hour_codes * len(_days) + _day_codes
+    if len(_cells) == 0 or np.bincount(_cells).max() == 1:
+        _values = _df[_value_col].to_numpy()[_valid]
+        _dtype = np.promote_types(_values.dtype, np.float32)
+        _grid = np.full((len(_hours), len(_days)), np.nan, dtype=_dtype)
+        _grid[_hour_codes, _day_codes] = _values
+
+        return pd.DataFrame(
+            _grid,
+            index=pd.Index(_hours, name=_hour_col),
+            columns=pd.Index(_days, name=_day_col),
+        )
+
+    # duplicated (day, hour) pairs: let pivot report them
+    return _df.pivot(index=_hour_col, columns=_day_col, values=_value_col)
+
+
+@st.cache_data(show_spinner=False)
+def resample_daily_energy(df: pd.DataFrame) -> pd.DataFrame:
+    return df[["USAGE"]].resample("D").sum()
+
+
+@st.cache_data(show_spinner=False)
+def pivot_energy(df: pd.DataFrame) -> pd.DataFrame:
+    return pivot_hourly(df, "DATE", "START TIME", "USAGE")
+
+
+@st.cache_data(show_spinner=False)
+def dedup_pivot_weather(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    logger.info("De-duplicate weather to accommodate time change")
+    _hourly_df = df.drop_duplicates(subset=["DAY", "HOUR"], keep="first")
+
+    logger.info("Pivot weather for heat map")
+    _map_df = pivot_hourly(_hourly_df, "DAY", "HOUR", "TEMP_F")
+
+    return _hourly_df, _map_df
+
+
+@st.cache_data(show_spinner=False)
+def group_energy_by_hour_month(df: pd.DataFrame) -> pd.DataFrame:
+    # only sum USAGE and skip month / hour combinations absent from the data
+    return (
+        df.groupby(["START TIME", "MONTH"], observed=True, sort=False)["USAGE"]
+        .sum()
+        .reset_index()
+    )
+
+
 def get_heatmap_ticks(_df: pd.DataFrame) -> CustomTicks:
-    _first_of_month_cols = [col for col in _df.columns if str(col).endswith("01")]
+    _days = pd.DatetimeIndex(_df.columns)
+    _first_of_month_locs = np.flatnonzero(_days.day == 1)
 
-    _custom_x_ticks = [_df.columns.get_loc(col) for col in _first_of_month_cols]
+    _custom_x_ticks = _first_of_month_locs.tolist()
 
-    _custom_x_tick_labels = [
-        col.strftime("%b %Y") for col in _df.columns if str(col).endswith("01")
-    ]
+    _custom_x_tick_labels = _days[_first_of_month_locs].strftime("%b %Y").tolist()
 
     _custom_y_ticks = [i * 4 for i in range(7)]
     _custom_y_tick_labels = [f"{i:02}:00" for i in _custom_y_ticks]
@@ -241,6 +393,49 @@ def get_heatmap_ticks(_df: pd.DataFrame) -> CustomTicks:
     )
 
 
+def scale_to_unit(_z: np.ndarray) -> np.ndarray:
+    # min-max scale ignoring NaN, an all-NaN array stays NaN and a flat one maps to 0
+    _finite = _z[~np.isnan(_z)]
+    if _finite.size == 0:
+        return np.full(_z.shape, np.nan)
+
+    _span = _finite.max() - _finite.min()
+    if _span == 0:
+        return np.where(np.isnan(_z), np.nan, 0.0)
+
+    return (_z - _finite.min()) / _span
+
+
+def composite_energy_over_weather(
+    _weather_z: np.ndarray, _energy_z: np.ndarray
+) -> np.ndarray:
+    # color temperature with the portland colorscale, as the temperature heat map does
+    _scale = pc.get_colorscale("portland")
+    _scale_pos = [pos for pos, _ in _scale]
+    _scale_rgb = np.array([pc.unlabel_rgb(color) for _, color in _scale])
+    _weather_t = scale_to_unit(_weather_z)
+    _rgb = np.stack(
+        [np.interp(_weather_t, _scale_pos, _scale_rgb[:, i]) for i in range(3)],
+        axis=-1,
+    )
+
+    # blend white on top with opacity from alpha_scale, as the energy overlay did
+    _alpha_pos = [pos for pos, _ in alpha_scale]
+    _alpha_val = [
+        float(color.rsplit(",", 1)[1].rstrip(")")) for _, color in alpha_scale
+    ]
+    _energy_t = scale_to_unit(_energy_z)
+    _alpha = np.interp(np.nan_to_num(_energy_t), _alpha_pos, _alpha_val)[..., None]
+    _rgb = _rgb * (1 - _alpha) + 255 * _alpha
+
+    # hours without temperature (e.g. the spring-forward gap) are left transparent
+    _rgba = np.empty(_weather_z.shape + (4,), dtype=np.uint8)
+    _rgba[..., :3] = np.nan_to_num(_rgb).round()
+    _rgba[..., 3] = ~np.isnan(_weather_t)
+
+    return _rgba
+
+
 def make_heatmaps(
     _weather_df: pd.DataFrame,
     _energy_df: pd.DataFrame,
@@ -261,17 +456,21 @@ def make_heatmaps(
     )
     _fig.update_yaxes(autorange="reversed")
 
+    # convert each frame to a float32 array once and share it between traces
+    _energy_z = _energy_df.to_numpy(dtype=np.float32)
+    _weather_z = _weather_df.to_numpy(dtype=np.float32)
+
     _colorbar_1_dict = dict(len=0.3, x=1.025, y=0.85, title="kWh")
     _colorbar_2_dict = dict(len=0.3, x=1.025, y=0.5, title="°F")
-    _colorbar_3_dict = dict(len=0.3, x=1.025, y=0.15, title="°F")
 
     _fig.add_trace(
         go.Heatmap(
             x=_energy_df.columns,
             y=_energy_df.index,
-            z=_energy_df,
+            z=_energy_z,
             opacity=1,
             colorscale="portland",
+            zsmooth="fast",
             colorbar=_colorbar_1_dict,
         ),
         row=1,
@@ -282,36 +481,45 @@ def make_heatmaps(
         go.Heatmap(
             x=_weather_df.columns,
             y=_weather_df.index,
-            z=_weather_df,
+            z=_weather_z,
             opacity=1,
             colorscale="portland",
+            zsmooth="fast",
             colorbar=_colorbar_2_dict,
         ),
         row=2,
         col=1,
     )
 
-    _fig.add_trace(
-        go.Heatmap(
-            x=_energy_df.columns,
-            y=_energy_df.index,
-            z=_weather_df,
-            opacity=1,
-            colorscale="portland",
-            colorbar=_colorbar_3_dict,
-        ),
-        row=3,
-        col=1,
-    )
+    logger.info("Compositing energy over temperature into a single image")
+    _energy_days = pd.to_datetime(_energy_df.columns)
+    _weather_days = pd.to_datetime(_weather_df.columns)
+
+    # energy hours are "HH:00" labels, weather hours are HOUR ints
+    _energy_hours = pd.Index([int(str(hour)[:2]) for hour in _energy_df.index])
+    _weather_hours = pd.Index(_weather_df.index)
+
+    # weather can span an extra partial day or be missing hours (or all data),
+    # line its rows and columns up with energy and leave the rest NaN
+    _row_pos = _weather_hours.get_indexer(_energy_hours)
+    _col_pos = _weather_days.get_indexer(_energy_days)
+    _rows = np.flatnonzero(_row_pos >= 0)
+    _cols = np.flatnonzero(_col_pos >= 0)
+
+    _weather_on_energy_z = np.full_like(_energy_z, np.nan)
+    _weather_on_energy_z[np.ix_(_rows, _cols)] = _weather_z[
+        np.ix_(_row_pos[_rows], _col_pos[_cols])
+    ]
 
     _fig.add_trace(
-        go.Heatmap(
-            x=_energy_df.columns,
-            y=_energy_df.index,
-            z=_energy_df.to_numpy(),
-            opacity=1,
-            colorscale=alpha_scale,
-            showscale=False,
+        go.Image(
+            z=composite_energy_over_weather(_weather_on_energy_z, _energy_z),
+            colormodel="rgba",
+            x0=_energy_days[0],
+            dx=pd.Timedelta(days=1).total_seconds() * 1000,
+            y0=0,
+            dy=1,
+            hoverinfo="x+y",
         ),
         row=3,
         col=1,
@@ -333,9 +541,12 @@ def make_heatmaps(
 
 
 def make_line_plot(params: PlotParams) -> go.Figure:
-    _mean_value = params.df[params.y_col].mean()
+    _x = params.df[params.x_col] if isinstance(params.x_col, str) else params.x_col
+
+    # switch to WebGL for long series, as px.line's render_mode="auto" did
+    _scatter = go.Scattergl if len(params.df) > 1000 else go.Scatter
 
-    _fig = px.line(params.df, x=params.x_col, y=params.y_col)
+    _fig = go.Figure(_scatter(x=_x, y=params.df[params.y_col], mode="lines"))
     return _fig
 
 
@@ -348,13 +559,14 @@ def create_combined_line_plots(*_plot_params) -> go.Figure:
         subplot_titles=[p.title for p in _plot_params],
     )
 
-    for i, params in enumerate(_plot_params, start=1):
+    # nanmean as weather temperature can have missing hours
+    _line_means = [np.nanmean(p.df[p.y_col].to_numpy()) for p in _plot_params]
+
+    for i, (params, line_mean) in enumerate(zip(_plot_params, _line_means), start=1):
         plot = make_line_plot(params)
         for trace in plot.data:
             _subplot.add_trace(trace, row=i, col=1)
 
-        line_mean = params.df[params.y_col].mean()
-
         _subplot.add_shape(
             type="line",
             x0=0,
@@ -379,21 +591,45 @@ def create_combined_line_plots(*_plot_params) -> go.Figure:
 
 
 def make_bar_char(params: PlotParams) -> go.Figure:
-    _fig = px.bar(
-        params.df,
-        x=params.x_col,
-        y=params.y_col,
-        color=params.color_col,
-        height=400,
-        title=params.title,
-        color_discrete_sequence=px.colors.qualitative.Light24,
-        category_orders=params.cat_order,
-    )
+    _cat_order = params.cat_order or {}
+    _colors = pc.qualitative.Light24
+
+    if params.color_col is None:
+        _groups = {None: params.df}
+    else:
+        _groups = dict(
+            tuple(params.df.groupby(params.color_col, observed=True, sort=False))
+        )
+
+    # stack one trace per color group, in category order when one is given
+    _color_order = [
+        value for value in _cat_order.get(params.color_col, []) if value in _groups
+    ]
+    _color_order += [value for value in _groups if value not in _color_order]
+
+    _fig = go.Figure()
+
+    for i, value in enumerate(_color_order):
+        _group_df = _groups[value]
+        _fig.add_trace(
+            go.Bar(
+                x=_group_df[params.x_col],
+                y=_group_df[params.y_col],
+                name=None if value is None else str(value),
+                marker_color=_colors[i % len(_colors)],
+            )
+        )
+
+    if params.x_col in _cat_order:
+        _fig.update_xaxes(categoryorder="array", categoryarray=_cat_order[params.x_col])
 
     _fig.update_layout(
         title=params.title,
         xaxis_title=params.x_label,
         yaxis_title=params.y_label,
+        barmode="relative",
+        height=400,
+        legend_title_text=params.color_col,
     )
 
     return _fig
@@ -450,68 +686,37 @@ We are interested in the one that starts with: `pge_electric_usage`"""
 upload_csv = st.file_uploader("Upload your pge_electric_usage ... .csv")
 
 if upload_csv is None:
-    logger.info(f"No file uploaded, reading: {filename}")
+    logger.info("No file uploaded, reading: %s", filename)
     try:
         with open(filename, "rb") as file:
             upload_csv = BytesIO(file.read())
             upload_csv.seek(0)
     except Exception as e:
-        logger.error(f"Error: could not read: {filename}: {e}")
+        logger.error("Error: could not read: %s: %s", filename, e)
         st.error(f"Error: could not read: {filename}: {e}")
         st.stop()
 
 if upload_csv is not None:
-    header_address = get_zip_header_line_col_names(upload_csv)
+    logger.info("Reading uploaded bytes so cached functions can hash them")
+    upload_bytes = upload_csv.getvalue()
 
-    logger.info(f"Column names: {header_address.col_names}")
+    header_address = get_zip_header_line_col_names(upload_bytes)
 
-    logger.info("Rewinding file to process with pandas")
-    upload_csv.seek(0)
+    logger.info("Column names: %s", header_address.col_names)
 
     logger.info("Read csv to df")
-    df = read_process_csv(upload_csv, header_address)
+    df = load_energy_df(upload_bytes, header_address)
 
     logger.info("Getting first and last datetimes")
     start_end_datetime = StartEndDatetime(df.index[0], df.index[-1])
 
-    logger.info("Resample energy to daily for line plot")
-    daily_electric_df = df.resample("D").sum()
-
     logger.info("Pivot energy for heat map")
-    electric_map_df = df.pivot(index="START TIME", columns="DATE", values="USAGE")
+    electric_map_df = pivot_energy(df)
 
-    logger.info(f"Get API weather for zip code: {header_address.zip_5_4[0]}")
+    logger.info("Get API weather for zip code: %s", header_address.zip_5_4[0])
     weather_hourly_df = get_process_weather(header_address, start_end_datetime)
 
-    logger.info("De-duplicate weather to accommodate time change")
-    weather_hourly_df = weather_hourly_df[
-        ~weather_hourly_df.duplicated(subset=["DATE", "TIME"], keep="first")
-    ]
-
-    logger.info("Pivot weather for heat map")
-    weather_map_df = weather_hourly_df.pivot(
-        index="TIME", columns="DATE", values="TEMP_F"
-    )
-
-    logger.info("Creating PlotParams instance for daily energy line plot")
-    electric_params = PlotParams(
-        df=daily_electric_df,
-        x_col=daily_electric_df.index,
-        y_col="USAGE",
-        title="Daily cumulative energy usage (w/ mean)",
-        x_label="Date (Pacific time)",
-        y_label="Energy (kWh)",
-    )
-
-    logger.info("Creating PlotParams instance for daily weather line plot")
-    weather_params = PlotParams(
-        df=weather_hourly_df,
-        x_col=weather_hourly_df.index,
-        y_col="TEMP_F",
-        title="Daily average temperature (w/ mean)",
-        x_label="Date (Pacific time)",
-        y_label="Temperature (°F)",
-    )
+    weather_hourly_df, weather_map_df = dedup_pivot_weather(weather_hourly_df)
 
     logger.info("Generating custom x and y ticks for heat maps")
     custom_ticks = get_heatmap_ticks(weather_map_df)
@@ -545,6 +750,11 @@ The intent is to explore energy usage by time of day, time of year, and compared
         )
 
     logger.info("Plotting heat maps")
+    # zsmooth="fast" draws each heat map as one image, keep its pixels blocky
+    st.markdown(
+        "<style>.heatmaplayer image { image-rendering: pixelated; }</style>",
+        unsafe_allow_html=True,
+    )
     fig = make_heatmaps(weather_map_df, electric_map_df, header_address, custom_ticks)
     st.plotly_chart(fig, use_container_width=True)
 
@@ -564,9 +774,33 @@ The intent is to explore energy usage by time of year
 """
         )
 
-    logger.info("Plotting line plots")
-    fig = create_combined_line_plots(electric_params, weather_params)
-    st.plotly_chart(fig, use_container_width=True)
+    if st.checkbox("Show line plots", value=False):
+        logger.info("Resample energy to daily for line plot")
+        daily_electric_df = resample_daily_energy(df)
+
+        logger.info("Creating PlotParams instance for daily energy line plot")
+        electric_params = PlotParams(
+            df=daily_electric_df,
+            x_col=daily_electric_df.index,
+            y_col="USAGE",
+            title="Daily cumulative energy usage (w/ mean)",
+            x_label="Date (Pacific time)",
+            y_label="Energy (kWh)",
+        )
+
+        logger.info("Creating PlotParams instance for daily weather line plot")
+        weather_params = PlotParams(
+            df=weather_hourly_df,
+            x_col=weather_hourly_df.index,
+            y_col="TEMP_F",
+            title="Daily average temperature (w/ mean)",
+            x_label="Date (Pacific time)",
+            y_label="Temperature (°F)",
+        )
+
+        logger.info("Plotting line plots")
+        fig = create_combined_line_plots(electric_params, weather_params)
+        st.plotly_chart(fig, use_container_width=True)
 
     with st.expander("About bar charts"):
         st.markdown(
@@ -581,41 +815,40 @@ The intent is to explore energy usage by time of year and hour of day
 """
         )
 
-    logger.info("Generating plot_df grouped by hour and month")
-    plot_df = df.groupby(["START TIME", "MONTH"]).sum().USAGE
-    plot_df = plot_df.reset_index()
-    plot_df["MONTH"] = plot_df["MONTH"].astype(str)
-
-    logger.info("Creating PlotParams instance for energy by hour and month")
-    cat_order = {"MONTH": month_order}
-    plot_params = PlotParams(
-        df=plot_df,
-        x_col="START TIME",
-        y_col="USAGE",
-        color_col="MONTH",
-        title="Cumulative energy usage by hour and month",
-        x_label="Starting hour",
-        y_label="Cumulative energy (kWh)",
-        cat_order=cat_order,
-    )
-
-    logger.info("Making bar chart for energy by hour and month")
-    fig = make_bar_char(plot_params)
-    st.plotly_chart(fig, use_container_width=True)
+    if st.checkbox("Show bar charts", value=False):
+        logger.info("Generating plot_df grouped by hour and month")
+        plot_df = group_energy_by_hour_month(df)
+
+        logger.info("Creating PlotParams instance for energy by hour and month")
+        cat_order = {"MONTH": month_order}
+        plot_params = PlotParams(
+            df=plot_df,
+            x_col="START TIME",
+            y_col="USAGE",
+            color_col="MONTH",
+            title="Cumulative energy usage by hour and month",
+            x_label="Starting hour",
+            y_label="Cumulative energy (kWh)",
+            cat_order=cat_order,
+        )
 
-    logger.info("Creating PlotParams instance for energy by month and hour")
-    cat_order = {"MONTH": month_order, "START TIME": hour_order}
-    plot_params = PlotParams(
-        df=plot_df,
-        x_col="MONTH",
-        y_col="USAGE",
-        color_col="START TIME",
-        title="Cumulative energy usage by month and hour",
-        x_label="Month",
-        y_label="Cumulative energy (kWh)",
-        cat_order=cat_order,
-    )
+        logger.info("Making bar chart for energy by hour and month")
+        fig = make_bar_char(plot_params)
+        st.plotly_chart(fig, use_container_width=True)
+
+        logger.info("Creating PlotParams instance for energy by month and hour")
+        cat_order = {"MONTH": month_order, "START TIME": hour_order}
+        plot_params = PlotParams(
+            df=plot_df,
+            x_col="MONTH",
+            y_col="USAGE",
+            color_col="START TIME",
+            title="Cumulative energy usage by month and hour",
+            x_label="Month",
+            y_label="Cumulative energy (kWh)",
+            cat_order=cat_order,
+        )
 
-    logger.info("Making bar chart for energy by month and hour")
-    fig = make_bar_char(plot_params)
-    st.plotly_chart(fig, use_container_width=True)
+        logger.info("Making bar chart for energy by month and hour")
+        fig = make_bar_char(plot_params)
+        st.plotly_chart(fig, use_container_width=True)